@@ -0,0 +1,93 @@
+import random
+import sys
+import time
+
+from simple_recommender import SimpleCottageRecommender
+
+SPECIAL_REQUESTS = [
+    '',
+    'Birthday celebration with videoke',
+    'Wedding anniversary dinner',
+    'Company party',
+    'Family gathering with karaoke'
+]
+
+def generate_data(num_cottages, num_bookings, num_reviews, seed=42):
+    """Generate synthetic resort data for benchmarking"""
+    rng = random.Random(seed)
+
+    cottages = []
+    for i in range(num_cottages):
+        min_capacity = rng.randint(2, 15)
+        cottages.append({
+            '_id': f'cottage{i}',
+            'name': 'VE Cottage' if i == 0 else f'Cottage {i}',
+            'description': 'Perfect for celebrations with videoke system' if i % 4 == 0 else 'Cozy cottage',
+            'price': rng.randint(3, 25) * 100,
+            'capacity': f'{min_capacity}-{min_capacity + rng.randint(0, 10)} guests',
+            'image': 'vecottage.jpg'
+        })
+
+    bookings = []
+    for i in range(num_bookings):
+        bookings.append({
+            '_id': f'booking{i}',
+            'cottageId': f'cottage{rng.randrange(num_cottages)}',
+            'status': rng.choice(['confirmed', 'completed']),
+            'numberOfPeople': rng.randint(1, 25)
+        })
+
+    comments = ['Great for birthday parties!', 'Loved the karaoke', 'Perfect for our anniversary', 'Nice and clean']
+    reviews = []
+    for i in range(num_reviews):
+        reviews.append({
+            '_id': f'review{i}',
+            'cottageId': f'cottage{rng.randrange(num_cottages)}',
+            'rating': rng.randint(1, 5),
+            'comment': rng.choice(comments)
+        })
+
+    return cottages, bookings, reviews
+
+def time_requests(recommender, num_requests, max_guest_count):
+    """Average latency of recommend_cottages in microseconds"""
+    rng = random.Random(7)
+    requests = [
+        (rng.randint(1, max_guest_count), rng.choice(SPECIAL_REQUESTS))
+        for _ in range(num_requests)
+    ]
+
+    start = time.perf_counter()
+    for guest_count, special_requests in requests:
+        recommender.recommend_cottages(guest_count, '2024-01-15', special_requests)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / num_requests * 1e6
+
+def main():
+    num_cottages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    num_bookings = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    num_reviews = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    num_requests = 500
+
+    cottages, bookings, reviews = generate_data(num_cottages, num_bookings, num_reviews)
+
+    recommender = SimpleCottageRecommender()
+    recommender.load_data(cottages, bookings, reviews)
+    max_guest_count = recommender.max_guest_count()
+
+    print(f"Data: {num_cottages} cottages, {num_bookings} bookings, {num_reviews} reviews")
+
+    live_latency = time_requests(recommender, num_requests, max_guest_count)
+    print(f"Live ranking: {live_latency:.1f} us/request")
+
+    start = time.perf_counter()
+    table = recommender.build_ranking_table()
+    rebuild_time = time.perf_counter() - start
+    print(f"Ranking table rebuild: {rebuild_time * 1000:.1f} ms ({len(table['rankings'])} rankings)")
+
+    table_latency = time_requests(recommender, num_requests, max_guest_count)
+    print(f"Materialized ranking: {table_latency:.1f} us/request")
+
+if __name__ == '__main__':
+    main()
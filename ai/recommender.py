@@ -360,5 +360,112 @@ def recommend():
 def health():
     return jsonify({'status': 'healthy', 'service': 'cottage-recommender'})
 
+# Multi-property service: one process hosts many resorts, each keyed by property id.
+# A property's data is loaded on its first request from its backend's /api/recommendations/data
+# feed and dropped again when the memory budget needs room for busier properties.
+import os
+from urllib.request import Request, urlopen
+from recommender_service import RecommenderService
+from simple_recommender import SimpleCottageRecommender
+
+PROPERTY_DATA_URL = os.environ.get(
+    'PROPERTY_DATA_URL', 'http://localhost:5000/api/recommendations/data?property_id={property_id}'
+)
+RECOMMENDER_DATA_KEY = os.environ.get('RECOMMENDER_DATA_KEY', '')
+
+property_service = RecommenderService(
+    memory_budget_bytes=int(os.environ.get('RECOMMENDER_MEMORY_BUDGET_MB', '256')) * 1024 * 1024
+)
+
+def make_property_loader(data_url):
+    """Loader that fetches a property's cottages, bookings and reviews from its backend"""
+    def load():
+        data_request = Request(data_url, headers={'X-Recommender-Key': RECOMMENDER_DATA_KEY})
+        with urlopen(data_request, timeout=30) as response:
+            data = json.loads(response.read())
+        return data.get('cottages', []), data.get('bookings', []), data.get('reviews', [])
+    return load
+
+def ensure_property(property_id):
+    """Register unknown properties with the default data URL"""
+    if not property_service.has_property(property_id):
+        property_service.register_property(
+            property_id, make_property_loader(PROPERTY_DATA_URL.format(property_id=property_id)), replace=False
+        )
+
+def property_service_fallback(guest_count, special_requests):
+    """Static recommendations when a property cannot be served"""
+    fallback_recommender = SimpleCottageRecommender()
+    return fallback_recommender.get_fallback_recommendations(
+        guest_count, fallback_recommender.detect_special_notes(special_requests)
+    )
+
+@app.route('/properties/<property_id>', methods=['PUT'])
+def register_property(property_id):
+    data = request.get_json(silent=True) or {}
+    data_url = data.get('data_url') or PROPERTY_DATA_URL.format(property_id=property_id)
+    property_service.register_property(property_id, make_property_loader(data_url))
+    return jsonify({'success': True, 'property_id': property_id, 'data_url': data_url})
+
+@app.route('/properties/<property_id>', methods=['DELETE'])
+def unregister_property(property_id):
+    property_service.unregister_property(property_id)
+    return jsonify({'success': True})
+
+@app.route('/properties/<property_id>/recommend', methods=['POST'])
+def recommend_for_property(property_id):
+    try:
+        data = request.get_json(silent=True) or {}
+        ensure_property(property_id)
+        
+        recommendations = property_service.recommend(
+            property_id,
+            guest_count=data.get('guest_count', 2),
+            booking_date=data.get('booking_date'),
+            special_requests=data.get('special_requests', '')
+        )
+        
+        return jsonify({'success': True, 'recommendations': recommendations})
+        
+    except Exception as e:
+        # Covers an unreachable data feed for a cold property as well as recommender errors
+        fallback = property_service_fallback(data.get('guest_count', 2), data.get('special_requests', ''))
+        return jsonify({'success': False, 'error': str(e), 'recommendations': fallback}), 500
+
+@app.route('/properties/<property_id>/bookings', methods=['POST'])
+def add_property_booking(property_id):
+    ensure_property(property_id)
+    property_service.add_booking(property_id, request.get_json(force=True))
+    return jsonify({'success': True})
+
+@app.route('/properties/<property_id>/bookings/<booking_id>', methods=['PUT'])
+def update_property_booking(property_id, booking_id):
+    ensure_property(property_id)
+    booking = dict(request.get_json(force=True), _id=booking_id)
+    property_service.update_booking(property_id, booking)
+    return jsonify({'success': True})
+
+@app.route('/properties/<property_id>/bookings/<booking_id>', methods=['DELETE'])
+def remove_property_booking(property_id, booking_id):
+    ensure_property(property_id)
+    property_service.remove_booking(property_id, booking_id)
+    return jsonify({'success': True})
+
+@app.route('/properties/<property_id>/reviews', methods=['POST'])
+def add_property_review(property_id):
+    ensure_property(property_id)
+    property_service.add_review(property_id, request.get_json(force=True))
+    return jsonify({'success': True})
+
+@app.route('/properties/<property_id>/reload', methods=['POST'])
+def reload_property(property_id):
+    ensure_property(property_id)
+    property_service.reload_property(property_id)
+    return jsonify({'success': True})
+
+@app.route('/stats', methods=['GET'])
+def service_stats():
+    return jsonify(property_service.stats())
+
 if __name__ == '__main__':
     app.run(port=5001, debug=True) 
\ No newline at end of file
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import OrderedDict
+
+from simple_recommender import SimpleCottageRecommender
+
+class _Tenant:
+    """One property hosted by the service"""
+    def __init__(self, loader):
+        self.loader = loader
+        self.recommender = None
+        self.load_lock = threading.Lock()
+        # Set while the loader runs; a write arriving then marks the load stale so it is redone
+        self.loading = False
+        self.stale = False
+        self.memory_bytes = 0
+        self.stats = {
+            'loads': 0,
+            'evictions': 0,
+            'requests': 0,
+            'total_latency_ms': 0.0,
+            'max_latency_ms': 0.0,
+            'last_load_ms': 0.0
+        }
+
+class RecommenderService:
+    """Host recommenders for many properties in one process under a shared memory budget"""
+    def __init__(self, memory_budget_bytes=256 * 1024 * 1024, materialize_rankings=True):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.materialize_rankings = materialize_rankings
+        self._tenants = {}
+        # Property ids with a loaded recommender, least recently used first
+        self._loaded = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def register_property(self, property_id, loader, replace=True):
+        """Register a property; loader() returns its (cottages, bookings, reviews). replace=False keeps an existing one"""
+        with self._lock:
+            if property_id in self._tenants:
+                if not replace:
+                    return
+                self._unload(property_id)
+            self._tenants[property_id] = _Tenant(loader)
+
+    def unregister_property(self, property_id):
+        """Stop hosting a property and free its data"""
+        with self._lock:
+            self._unload(property_id)
+            self._tenants.pop(property_id, None)
+
+    def reload_property(self, property_id):
+        """Drop a property's data so the next request loads it fresh"""
+        self._get_tenant(property_id)
+        with self._lock:
+            self._unload(property_id)
+
+    def recommend(self, property_id, guest_count, booking_date, special_requests=None, num_recommendations=3):
+        """Recommend cottages for one property, loading it first if it is cold"""
+        start = time.perf_counter()
+        tenant = self._get_tenant(property_id)
+        recommender = self._get_recommender(property_id, tenant)
+
+        recommendations = recommender.recommend_cottages(
+            guest_count=guest_count,
+            booking_date=booking_date,
+            special_requests=special_requests,
+            num_recommendations=num_recommendations
+        )
+        self._update_memory(property_id, tenant, recommender)
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            tenant.stats['requests'] += 1
+            tenant.stats['total_latency_ms'] += latency_ms
+            tenant.stats['max_latency_ms'] = max(tenant.stats['max_latency_ms'], latency_ms)
+
+        return recommendations
+
+    def has_property(self, property_id):
+        """Whether a property is registered"""
+        with self._lock:
+            return property_id in self._tenants
+
+    def add_booking(self, property_id, booking):
+        """Forward a saved booking to a loaded property; cold properties pick it up on their next load"""
+        self._forward_write(property_id, lambda recommender: recommender.add_booking(booking))
+
+    def update_booking(self, property_id, booking):
+        """Forward a changed booking (e.g. pending -> confirmed), matched by its _id"""
+        self._forward_write(property_id, lambda recommender: recommender.update_booking(booking))
+
+    def remove_booking(self, property_id, booking_id):
+        """Forward a cancelled or deleted booking's removal, by _id"""
+        self._forward_write(property_id, lambda recommender: recommender.remove_booking(booking_id))
+
+    def add_review(self, property_id, review):
+        """Forward a saved review to a loaded property; cold properties pick it up on their next load"""
+        self._forward_write(property_id, lambda recommender: recommender.add_review(review))
+
+    def stats(self):
+        """Memory use and per-property load and latency statistics"""
+        with self._lock:
+            properties = {}
+            for property_id, tenant in self._tenants.items():
+                tenant_stats = dict(tenant.stats)
+                requests = tenant_stats['requests']
+                tenant_stats['avg_latency_ms'] = tenant_stats['total_latency_ms'] / requests if requests else 0.0
+                tenant_stats['loaded'] = tenant.recommender is not None
+                tenant_stats['data_version'] = tenant.recommender.data_version if tenant.recommender else None
+                tenant_stats['memory_bytes'] = tenant.memory_bytes
+                properties[property_id] = tenant_stats
+
+            return {
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'memory_bytes': self._memory_bytes,
+                'loaded_properties': list(self._loaded),
+                'properties': properties
+            }
+
+    def _get_tenant(self, property_id):
+        """Look up a registered property or raise KeyError"""
+        with self._lock:
+            tenant = self._tenants.get(property_id)
+        if tenant is None:
+            raise KeyError(f"Unknown property: {property_id}")
+        return tenant
+
+    def _forward_write(self, property_id, write):
+        """Apply a write to a loaded property, or mark an in-progress load stale so it is redone"""
+        tenant = self._get_tenant(property_id)
+        with self._lock:
+            recommender = tenant.recommender
+            if recommender is None and tenant.loading:
+                # The loader may have read its data before this write was saved
+                tenant.stale = True
+        if recommender is None:
+            return
+
+        write(recommender)
+        # Writes grow the property without a request, so account for them here
+        self._update_memory(property_id, tenant, recommender)
+
+    def _get_recommender(self, property_id, tenant):
+        """Return the property's recommender, loading it if it was never loaded or was evicted"""
+        with self._lock:
+            recommender = tenant.recommender
+            if recommender is not None:
+                self._loaded.move_to_end(property_id)
+                return recommender
+
+        # Load outside the service lock so a slow loader only delays its own property
+        with tenant.load_lock:
+            with self._lock:
+                if tenant.recommender is not None:
+                    self._loaded.move_to_end(property_id)
+                    return tenant.recommender
+
+            while True:
+                with self._lock:
+                    tenant.loading = True
+                    tenant.stale = False
+                try:
+                    start = time.perf_counter()
+                    cottages, bookings, reviews = tenant.loader()
+                    recommender = SimpleCottageRecommender(materialize_rankings=self.materialize_rankings)
+                    recommender.on_ranking_table_installed = (
+                        lambda recommender=recommender: self._update_memory(property_id, tenant, recommender)
+                    )
+                    recommender.load_data(cottages, bookings, reviews)
+                    load_ms = (time.perf_counter() - start) * 1000
+                except Exception:
+                    with self._lock:
+                        tenant.loading = False
+                    raise
+
+                # Clearing loading, checking stale and installing happen in one critical section,
+                # so a concurrent write either marks this load stale or finds the installed recommender
+                with self._lock:
+                    if self._tenants.get(property_id) is not tenant:
+                        # Unregistered or re-registered while loading
+                        tenant.loading = False
+                        return recommender
+                    if tenant.stale:
+                        # A write arrived mid-load; load again so it is not lost
+                        continue
+                    tenant.loading = False
+                    tenant.recommender = recommender
+                    tenant.stats['loads'] += 1
+                    tenant.stats['last_load_ms'] = load_ms
+                    self._loaded[property_id] = True
+                break
+
+        self._update_memory(property_id, tenant, recommender)
+        return recommender
+
+    def _update_memory(self, property_id, tenant, recommender):
+        """Refresh a property's memory estimate and evict cold properties if over budget"""
+        memory_bytes = recommender.estimate_memory()
+
+        with self._lock:
+            if tenant.recommender is not recommender:
+                return
+            self._memory_bytes += memory_bytes - tenant.memory_bytes
+            tenant.memory_bytes = memory_bytes
+            self._evict(keep=property_id)
+
+    def _evict(self, keep):
+        """Unload least recently used properties until within budget (caller holds the lock)"""
+        while self._memory_bytes > self.memory_budget_bytes:
+            cold_id = next((property_id for property_id in self._loaded if property_id != keep), None)
+            if cold_id is None:
+                break
+            self._unload(cold_id)
+            self._tenants[cold_id].stats['evictions'] += 1
+
+    def _unload(self, property_id):
+        """Drop a property's recommender and memory accounting (caller holds the lock)"""
+        tenant = self._tenants.get(property_id)
+        if tenant is None or tenant.recommender is None:
+            return
+        self._loaded.pop(property_id, None)
+        self._memory_bytes -= tenant.memory_bytes
+        tenant.recommender = None
+        tenant.memory_bytes = 0
@@ -1,20 +1,220 @@
 import json
 import re
 import sys
+import threading
+from array import array
 from datetime import datetime
 from collections import Counter
 
+def _estimate_size(obj, seen=None):
+    """Approximate the memory used by an object and everything it contains"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _estimate_size(key, seen) + _estimate_size(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            size += _estimate_size(item, seen)
+    return size
+
 class SimpleCottageRecommender:
-    def __init__(self):
+    # Party sizes within this many guests count as "about the same size"
+    PARTY_SIZE_TOLERANCE = 2
+    # Largest party size with its own histogram bucket (the booking form's limit); larger parties share one overflow bucket
+    MAX_PARTY_SIZE = 50
+    # Occasions in detect_special_notes order; a request's occasions map to a bitmask over these
+    OCCASIONS = ('birthday', 'anniversary', 'party', 'videoke')
+    # Number of recommendations materialized per point of the ranking table
+    RANKING_TABLE_TOP_K = 3
+    # Average rating an occasion's reviews need before we tell guests the cottage is recommended for it
+    OCCASION_REASON_MIN_RATING = 4
+    
+    def __init__(self, materialize_rankings=False):
         self.cottages = []
         self.bookings = []
         self.reviews = []
+        # occasion -> {cottage_id: {'mentions': n, 'rating_total': sum}}
+        self.occasion_index = {}
+        self.occasion_max_mentions = {}
+        # cottage_id -> array of booking counts indexed by party size, last bucket counts parties over MAX_PARTY_SIZE
+        self.party_size_histograms = {}
+        self.party_size_totals = {}
+        # booking _id -> position in self.bookings, so bookings can be replaced or removed in O(1)
+        self._booking_positions = {}
+        
+        # Bumped on every data change; the ranking table is only served for the version it was built from
+        self.data_version = 0
+        self.materialize_rankings = materialize_rankings
+        self._data_lock = threading.Lock()
+        self._ranking_table = None
+        self._ranking_builder = None
+        self._ranking_rebuild_requested = False
+        self._builder_lock = threading.Lock()
+        # Approximate bytes of data and indexes, kept current so estimate_memory never walks the data
+        self._data_bytes = 0
+        # Called with no arguments after a background or direct build installs a new ranking table
+        self.on_ranking_table_installed = None
         
     def load_data(self, cottages_data, bookings_data, reviews_data):
         """Load data from the resort system"""
-        self.cottages = cottages_data
-        self.bookings = bookings_data
-        self.reviews = reviews_data
+        with self._data_lock:
+            # Copy so add_booking/add_review never append into the caller's lists
+            self.cottages = list(cottages_data)
+            self.bookings = list(bookings_data)
+            self.reviews = list(reviews_data)
+            self.build_occasion_index()
+            self.build_party_size_histograms()
+            self._booking_positions = {
+                booking.get('_id'): position for position, booking in enumerate(self.bookings)
+                if booking.get('_id') is not None
+            }
+            self._data_bytes = self._estimate_data_bytes()
+            self.data_version += 1
+        self._on_data_changed()
+        
+    def build_occasion_index(self):
+        """Index review comments by the occasions they mention"""
+        self.occasion_index = {}
+        self.occasion_max_mentions = {}
+        for review in self.reviews:
+            self._index_review(review)
+    
+    def _index_review(self, review):
+        """Add one review's occasion mentions to the index"""
+        cottage_id = review.get('cottageId')
+        rating = review.get('rating', 0)
+        
+        for occasion in self.detect_special_notes(review.get('comment', '')):
+            cottage_entries = self.occasion_index.setdefault(occasion, {})
+            entry = cottage_entries.setdefault(cottage_id, {'mentions': 0, 'rating_total': 0})
+            entry['mentions'] += 1
+            entry['rating_total'] += rating
+            
+            # Mentions only ever grow, so the per-occasion max can be kept up to date
+            if entry['mentions'] > self.occasion_max_mentions.get(occasion, 0):
+                self.occasion_max_mentions[occasion] = entry['mentions']
+    
+    def add_review(self, review):
+        """Add a new review and update the occasion index incrementally"""
+        with self._data_lock:
+            self.reviews.append(review)
+            self._index_review(review)
+            # The indexes are bounded by cottages x occasions/party sizes, so only the row adds memory
+            self._data_bytes += _estimate_size(review)
+            self.data_version += 1
+        self._on_data_changed()
+        
+    def build_party_size_histograms(self):
+        """Count booked party sizes per cottage"""
+        self.party_size_histograms = {}
+        self.party_size_totals = {}
+        for booking in self.bookings:
+            self._index_booking(booking)
+    
+    def _party_size_bucket(self, booking):
+        """Histogram bucket a booking counts in, or None if it is not counted"""
+        if booking.get('status') not in ['confirmed', 'completed']:
+            return None
+            
+        try:
+            party_size = int(booking.get('numberOfPeople') or 0)
+        except (TypeError, ValueError):
+            return None
+        if party_size <= 0:
+            return None
+            
+        return min(party_size, self.MAX_PARTY_SIZE + 1)
+    
+    def _index_booking(self, booking):
+        """Add one booking's party size to its cottage's histogram"""
+        bucket = self._party_size_bucket(booking)
+        if bucket is None:
+            return
+            
+        cottage_id = booking.get('cottageId')
+        histogram = self.party_size_histograms.setdefault(cottage_id, array('I'))
+        if len(histogram) <= bucket:
+            histogram.extend([0] * (bucket + 1 - len(histogram)))
+        histogram[bucket] += 1
+        self.party_size_totals[cottage_id] = self.party_size_totals.get(cottage_id, 0) + 1
+    
+    def _unindex_booking(self, booking):
+        """Remove one booking's party size from its cottage's histogram"""
+        bucket = self._party_size_bucket(booking)
+        if bucket is None:
+            return
+            
+        cottage_id = booking.get('cottageId')
+        self.party_size_histograms[cottage_id][bucket] -= 1
+        total = self.party_size_totals[cottage_id] - 1
+        if total:
+            self.party_size_totals[cottage_id] = total
+        else:
+            del self.party_size_totals[cottage_id]
+            del self.party_size_histograms[cottage_id]
+    
+    def _store_booking(self, booking):
+        """Insert a booking, or replace the one with the same _id (caller holds the data lock)"""
+        booking_id = booking.get('_id')
+        position = self._booking_positions.get(booking_id) if booking_id is not None else None
+        
+        if position is None:
+            if booking_id is not None:
+                self._booking_positions[booking_id] = len(self.bookings)
+            self.bookings.append(booking)
+            self._data_bytes += _estimate_size(booking)
+        else:
+            previous = self.bookings[position]
+            self._unindex_booking(previous)
+            self.bookings[position] = booking
+            self._data_bytes += _estimate_size(booking) - _estimate_size(previous)
+        self._index_booking(booking)
+    
+    def add_booking(self, booking):
+        """Add a new booking and update the party size histogram incrementally"""
+        with self._data_lock:
+            self._store_booking(booking)
+            self.data_version += 1
+        self._on_data_changed()
+    
+    def update_booking(self, booking):
+        """Replace the booking with the same _id, e.g. after a status change; unknown bookings are added"""
+        with self._data_lock:
+            self._store_booking(booking)
+            self.data_version += 1
+        self._on_data_changed()
+    
+    def remove_booking(self, booking_id):
+        """Remove a booking by _id, e.g. when it is cancelled or deleted; returns whether it was known"""
+        with self._data_lock:
+            position = self._booking_positions.pop(booking_id, None)
+            if position is None:
+                return False
+                
+            # Move the last booking into the gap so removal stays O(1)
+            removed = self.bookings[position]
+            last = self.bookings.pop()
+            if position < len(self.bookings):
+                self.bookings[position] = last
+                if last.get('_id') is not None:
+                    self._booking_positions[last.get('_id')] = position
+                    
+            self._unindex_booking(removed)
+            self._data_bytes -= _estimate_size(removed)
+            self.data_version += 1
+        self._on_data_changed()
+        return True
+    
+    def _on_data_changed(self):
+        """Kick off a ranking table rebuild when materialization is enabled"""
+        if self.materialize_rankings:
+            self.refresh_ranking_table()
         
     def analyze_best_sellers(self):
         """Find the most booked cottages"""
@@ -56,6 +256,39 @@ class SimpleCottageRecommender:
                 
         return avg_ratings
     
+    def analyze_occasion_affinity(self, cottage_id, special_occasions):
+        """Score how strongly reviewers tie a cottage to the requested occasions (0-1)"""
+        if not special_occasions:
+            return 0
+            
+        affinity = 0
+        for occasion in special_occasions:
+            entry = self.occasion_index.get(occasion, {}).get(cottage_id)
+            if entry:
+                # Share of the most-mentioned cottage, weighted by how those reviewers rated it
+                mention_share = entry['mentions'] / self.occasion_max_mentions[occasion]
+                average_rating = entry['rating_total'] / entry['mentions']
+                affinity += mention_share * (average_rating / 5)
+                
+        return affinity / len(special_occasions)
+    
+    def analyze_party_size_demand(self, cottage_id, guest_count):
+        """Share of a cottage's bookings made by parties of about guest_count (0-1)"""
+        total = self.party_size_totals.get(cottage_id, 0)
+        if not total:
+            return 0
+            
+        bucket = min(int(guest_count), self.MAX_PARTY_SIZE + 1)
+        if bucket < 1:
+            return 0
+            
+        histogram = self.party_size_histograms[cottage_id]
+        low = max(0, bucket - self.PARTY_SIZE_TOLERANCE)
+        high = min(len(histogram), bucket + self.PARTY_SIZE_TOLERANCE + 1)
+        similar_bookings = sum(histogram[low:high]) if low < high else 0
+        
+        return similar_bookings / total
+    
     def analyze_guest_count(self, guest_count):
         """Find cottages that best match the guest count"""
         suitable_cottages = []
@@ -114,99 +347,280 @@ class SimpleCottageRecommender:
     
     def recommend_cottages(self, guest_count, booking_date, special_requests=None, num_recommendations=3):
         """Main recommendation function"""
+        special_occasions = []
         try:
+            special_occasions = self.detect_special_notes(special_requests)
+            
+            # Serve from the materialized ranking table when it covers this request
+            ranking = self._lookup_ranking(guest_count, special_occasions, num_recommendations)
+            if ranking is not None:
+                return ranking
+            
             # Get analysis results
             best_sellers = self.analyze_best_sellers()
             top_ratings = self.analyze_ratings()
             guest_fit = self.analyze_guest_count(guest_count)
-            special_occasions = self.detect_special_notes(special_requests)
             
-            # Create scoring system
-            cottage_scores = {}
+            return self._rank_cottages(
+                guest_count, special_occasions, num_recommendations,
+                best_sellers, top_ratings, guest_fit
+            )
             
-            # Score cottages based on different factors
-            for cottage in self.cottages:
-                cottage_id = cottage.get('_id')
-                score = 0
-                
-                # Best seller score (0-30 points)
-                if cottage_id in best_sellers:
-                    max_bookings = max(best_sellers.values()) if best_sellers else 1
-                    score += (best_sellers[cottage_id] / max_bookings) * 30
-                
-                # Rating score (0-25 points)
-                if cottage_id in top_ratings:
-                    score += (top_ratings[cottage_id] / 5) * 25
+        except Exception as e:
+            print(f"Error in recommendation: {e}", file=sys.stderr)
+            # Fallback to simple recommendations
+            return self.get_fallback_recommendations(guest_count, special_occasions)
+    
+    def _rank_cottages(self, guest_count, special_occasions, num_recommendations,
+                       best_sellers, top_ratings, guest_fit):
+        """Score every cottage and build the top recommendations"""
+        # Create scoring system
+        cottage_scores = {}
+        
+        # Score cottages based on different factors
+        for cottage in self.cottages:
+            cottage_id = cottage.get('_id')
+            score = 0
+            
+            # Best seller score (0-30 points)
+            if cottage_id in best_sellers:
+                max_bookings = max(best_sellers.values()) if best_sellers else 1
+                score += (best_sellers[cottage_id] / max_bookings) * 30
+            
+            # Rating score (0-25 points)
+            if cottage_id in top_ratings:
+                score += (top_ratings[cottage_id] / 5) * 25
+            
+            # Guest count fit score (0-25 points)
+            for fit_cottage in guest_fit:
+                if fit_cottage['cottage_id'] == cottage_id:
+                    score += fit_cottage['fit_score'] * 25
+                    break
+            
+            # Party size demand from past bookings (0-10 points)
+            party_size_demand = self.analyze_party_size_demand(cottage_id, guest_count)
+            score += party_size_demand * 10
+            
+            # Occasion affinity from review comments (0-15 points)
+            occasion_affinity = self.analyze_occasion_affinity(cottage_id, special_occasions)
+            score += occasion_affinity * 15
+            
+            # Special occasion bonus (0-20 points)
+            if special_occasions:
+                cottage_name_lower = cottage.get('name', '').lower()
+                cottage_desc_lower = cottage.get('description', '').lower()
                 
-                # Guest count fit score (0-25 points)
-                for fit_cottage in guest_fit:
-                    if fit_cottage['cottage_id'] == cottage_id:
-                        score += fit_cottage['fit_score'] * 25
-                        break
+                # VE cottage bonus for special occasions
+                if 've' in cottage_name_lower and special_occasions:
+                    score += 20
                 
-                # Special occasion bonus (0-20 points)
-                if special_occasions:
-                    cottage_name_lower = cottage.get('name', '').lower()
-                    cottage_desc_lower = cottage.get('description', '').lower()
-                    
-                    # VE cottage bonus for special occasions
-                    if 've' in cottage_name_lower and special_occasions:
+                # Videoke bonus
+                if any(occasion in ['birthday', 'party', 'videoke'] for occasion in special_occasions):
+                    if 'videoke' in cottage_desc_lower or 've' in cottage_name_lower:
                         score += 20
-                    
-                    # Videoke bonus
-                    if any(occasion in ['birthday', 'party', 'videoke'] for occasion in special_occasions):
-                        if 'videoke' in cottage_desc_lower or 've' in cottage_name_lower:
-                            score += 20
-                
-                cottage_scores[cottage_id] = {
-                    'cottage': cottage,
-                    'score': score,
-                    'best_seller_rank': best_sellers.get(cottage_id, 0),
-                    'rating': top_ratings.get(cottage_id, 0),
-                    'guest_fit': next((fit for fit in guest_fit if fit['cottage_id'] == cottage_id), None)
-                }
-            
-            # Sort by score and get top recommendations
-            sorted_cottages = sorted(cottage_scores.items(), key=lambda x: x[1]['score'], reverse=True)
-            
-            recommendations = []
-            for cottage_id, data in sorted_cottages[:num_recommendations]:
-                cottage = data['cottage']
-                recommendation = {
-                    'cottage_id': cottage_id,
-                    'name': cottage.get('name'),
-                    'description': cottage.get('description'),
-                    'price': cottage.get('price'),
-                    'capacity': cottage.get('capacity'),
-                    'image': cottage.get('image'),
-                    'score': round(data['score'], 2),
-                    'reasons': []
-                }
-                
-                # Add reasons for recommendation
-                if data['best_seller_rank'] > 0:
-                    recommendation['reasons'].append(f"Popular choice - {data['best_seller_rank']} bookings")
-                
-                if data['rating'] > 0:
-                    recommendation['reasons'].append(f"Highly rated - {data['rating']:.1f}/5 stars")
-                
-                if data['guest_fit']:
-                    recommendation['reasons'].append(f"Perfect fit for {guest_count} guests")
-                
-                if special_occasions:
-                    if 've' in cottage.get('name', '').lower():
-                        recommendation['reasons'].append("Great for celebrations with videoke")
-                    elif any(occasion in ['birthday', 'party'] for occasion in special_occasions):
-                        recommendation['reasons'].append("Ideal for your special occasion")
-                
-                recommendations.append(recommendation)
             
-            return recommendations
+            cottage_scores[cottage_id] = {
+                'cottage': cottage,
+                'score': score,
+                'best_seller_rank': best_sellers.get(cottage_id, 0),
+                'rating': top_ratings.get(cottage_id, 0),
+                'guest_fit': next((fit for fit in guest_fit if fit['cottage_id'] == cottage_id), None),
+                'party_size_demand': party_size_demand,
+                'occasion_affinity': occasion_affinity
+            }
+        
+        # Sort by score and get top recommendations
+        sorted_cottages = sorted(cottage_scores.items(), key=lambda x: x[1]['score'], reverse=True)
+        
+        recommendations = []
+        for cottage_id, data in sorted_cottages[:num_recommendations]:
+            cottage = data['cottage']
+            recommendation = {
+                'cottage_id': cottage_id,
+                'name': cottage.get('name'),
+                'description': cottage.get('description'),
+                'price': cottage.get('price'),
+                'capacity': cottage.get('capacity'),
+                'image': cottage.get('image'),
+                'score': round(data['score'], 2),
+                'reasons': []
+            }
             
-        except Exception as e:
-            print(f"Error in recommendation: {e}", file=sys.stderr)
-            # Fallback to simple recommendations
-            return self.get_fallback_recommendations(guest_count, special_occasions)
+            # Add reasons for recommendation
+            if data['best_seller_rank'] > 0:
+                recommendation['reasons'].append(f"Popular choice - {data['best_seller_rank']} bookings")
+            
+            if data['rating'] > 0:
+                recommendation['reasons'].append(f"Highly rated - {data['rating']:.1f}/5 stars")
+            
+            if data['guest_fit']:
+                recommendation['reasons'].append(f"Perfect fit for {guest_count} guests")
+            
+            if data['party_size_demand'] > 0:
+                recommendation['reasons'].append(
+                    f"Booked by groups of about {guest_count} ({data['party_size_demand']:.0%} of bookings)"
+                )
+            
+            if data['occasion_affinity'] > 0:
+                # Low-rated mentions ("ruined our birthday party") still count toward affinity but are not praise
+                recommended_occasions = []
+                for occasion in special_occasions:
+                    entry = self.occasion_index.get(occasion, {}).get(cottage_id)
+                    if entry and entry['rating_total'] / entry['mentions'] >= self.OCCASION_REASON_MIN_RATING:
+                        recommended_occasions.append(occasion)
+                if recommended_occasions:
+                    recommendation['reasons'].append(f"Guests recommend it for {', '.join(recommended_occasions)}")
+            
+            if special_occasions:
+                if 've' in cottage.get('name', '').lower():
+                    recommendation['reasons'].append("Great for celebrations with videoke")
+                elif any(occasion in ['birthday', 'party'] for occasion in special_occasions):
+                    recommendation['reasons'].append("Ideal for your special occasion")
+            
+            recommendations.append(recommendation)
+        
+        return recommendations
+    
+    def max_guest_count(self):
+        """Largest party any cottage can hold, parsed from the capacity strings"""
+        max_capacity = 0
+        for cottage in self.cottages:
+            numbers = re.findall(r'\d+', cottage.get('capacity', '') or '')
+            if numbers:
+                max_capacity = max(max_capacity, int(numbers[-1]))
+        return max_capacity
+    
+    def _occasion_mask(self, special_occasions):
+        """Encode detected occasions as a bitmask over OCCASIONS"""
+        mask = 0
+        for bit, occasion in enumerate(self.OCCASIONS):
+            if occasion in special_occasions:
+                mask |= 1 << bit
+        return mask
+    
+    def _snapshot(self):
+        """Copy the data and indexes a ranking build reads (caller holds the data lock)"""
+        snapshot = SimpleCottageRecommender()
+        snapshot.cottages = list(self.cottages)
+        snapshot.bookings = list(self.bookings)
+        snapshot.reviews = list(self.reviews)
+        snapshot.occasion_index = {
+            occasion: {cottage_id: dict(entry) for cottage_id, entry in cottage_entries.items()}
+            for occasion, cottage_entries in self.occasion_index.items()
+        }
+        snapshot.occasion_max_mentions = dict(self.occasion_max_mentions)
+        snapshot.party_size_histograms = {
+            cottage_id: array('I', histogram) for cottage_id, histogram in self.party_size_histograms.items()
+        }
+        snapshot.party_size_totals = dict(self.party_size_totals)
+        snapshot.data_version = self.data_version
+        return snapshot
+    
+    def build_ranking_table(self):
+        """Materialize the top recommendations for every guest count and occasion combination"""
+        # Only the copy is taken under the lock; writers wait for that, not for the ranking itself
+        with self._data_lock:
+            snapshot = self._snapshot()
+        
+        version = snapshot.data_version
+        best_sellers = snapshot.analyze_best_sellers()
+        top_ratings = snapshot.analyze_ratings()
+        max_guest_count = snapshot.max_guest_count()
+        num_combinations = 1 << len(self.OCCASIONS)
+        
+        # Flat table indexed by (guest_count - 1) * num_combinations + occasion mask
+        rankings = []
+        for guest_count in range(1, max_guest_count + 1):
+            guest_fit = snapshot.analyze_guest_count(guest_count)
+            for mask in range(num_combinations):
+                special_occasions = [
+                    occasion for bit, occasion in enumerate(self.OCCASIONS) if mask & (1 << bit)
+                ]
+                rankings.append(snapshot._rank_cottages(
+                    guest_count, special_occasions, self.RANKING_TABLE_TOP_K,
+                    best_sellers, top_ratings, guest_fit
+                ))
+        
+        table = {
+            'version': version,
+            'max_guest_count': max_guest_count,
+            'rankings': rankings,
+            # Measured here, off the request path, so estimate_memory stays O(1)
+            'memory_bytes': _estimate_size(rankings)
+        }
+        
+        # Swap in the finished table with a single assignment so readers never see a partial build,
+        # but never replace a table built from newer data (concurrent direct and background builds)
+        with self._data_lock:
+            current = self._ranking_table
+            installed = current is None or current['version'] < version
+            if installed:
+                self._ranking_table = table
+        
+        if installed and self.on_ranking_table_installed is not None:
+            self.on_ranking_table_installed()
+        return table
+    
+    def refresh_ranking_table(self):
+        """Rebuild the ranking table in a background thread"""
+        with self._builder_lock:
+            self._ranking_rebuild_requested = True
+            if self._ranking_builder is None:
+                self._ranking_builder = threading.Thread(target=self._run_ranking_builder, daemon=True)
+                self._ranking_builder.start()
+            return self._ranking_builder
+    
+    def _run_ranking_builder(self):
+        """Keep rebuilding until no data change arrived during the last build"""
+        while True:
+            with self._builder_lock:
+                if not self._ranking_rebuild_requested:
+                    self._ranking_builder = None
+                    return
+                self._ranking_rebuild_requested = False
+            
+            try:
+                self.build_ranking_table()
+            except Exception as e:
+                # Keep serving live rankings; the stale table is never used
+                print(f"Error building ranking table: {e}", file=sys.stderr)
+    
+    @property
+    def ranking_table_version(self):
+        """Data version the current ranking table was built from, or None"""
+        table = self._ranking_table
+        return table['version'] if table is not None else None
+    
+    def _estimate_data_bytes(self):
+        """Walk the loaded data and indexes to size them (caller holds the data lock)"""
+        seen = set()
+        return sum(_estimate_size(obj, seen) for obj in [
+            self.cottages, self.bookings, self.reviews,
+            self.occasion_index, self.occasion_max_mentions,
+            self.party_size_histograms, self.party_size_totals,
+            self._booking_positions
+        ])
+    
+    def estimate_memory(self):
+        """Approximate bytes held by the loaded data, indexes and ranking table"""
+        table = self._ranking_table
+        return self._data_bytes + (table['memory_bytes'] if table is not None else 0)
+    
+    def _lookup_ranking(self, guest_count, special_occasions, num_recommendations):
+        """Return the materialized ranking for a request, or None if the table cannot serve it"""
+        table = self._ranking_table
+        if table is None or table['version'] != self.data_version:
+            return None
+        if num_recommendations > self.RANKING_TABLE_TOP_K:
+            return None
+        if not isinstance(guest_count, int) or not 1 <= guest_count <= table['max_guest_count']:
+            return None
+        
+        index = (guest_count - 1) * (1 << len(self.OCCASIONS)) + self._occasion_mask(special_occasions)
+        ranking = table['rankings'][index][:num_recommendations]
+        
+        # Hand out copies so callers cannot modify the shared table
+        return [dict(recommendation, reasons=list(recommendation['reasons'])) for recommendation in ranking]
     
     def get_fallback_recommendations(self, guest_count, special_occasions):
         """Fallback recommendations when ML analysis fails"""
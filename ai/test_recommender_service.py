@@ -0,0 +1,267 @@
+import threading
+import time
+import unittest
+
+from recommender_service import RecommenderService
+from simple_recommender import SimpleCottageRecommender
+
+def make_data(num_bookings=200):
+    """Small resort dataset; num_bookings controls its memory footprint"""
+    cottages = [
+        {'_id': 've', 'name': 'VE Cottage', 'description': 'With videoke', 'capacity': '10-25 guests'},
+        {'_id': 'kubo', 'name': 'Kubo Type', 'description': 'Traditional kubo', 'capacity': '5-15 guests'}
+    ]
+    bookings = [
+        {'_id': f'b{i}', 'cottageId': 've' if i % 2 else 'kubo', 'status': 'confirmed', 'numberOfPeople': 10}
+        for i in range(num_bookings)
+    ]
+    reviews = [{'_id': 'r1', 'cottageId': 've', 'rating': 5, 'comment': 'Great for birthday parties!'}]
+    return cottages, bookings, reviews
+
+class CountingLoader:
+    """Loader that records how often it was called"""
+    def __init__(self, data):
+        self.data = data
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.data
+
+class BlockingLoader(CountingLoader):
+    """Loader that waits for release() so a test can act while a load is in progress"""
+    def __init__(self, data):
+        super().__init__(data)
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        self.released.wait(5)
+        return super().__call__()
+
+    def release(self):
+        self.released.set()
+
+class HookedLock:
+    """Lock that runs a callback after every release, to act in the gaps between critical sections"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.after_release = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+        if self.after_release is not None:
+            self.after_release()
+
+def kubo_bookings(recommendations):
+    kubo = next(rec for rec in recommendations if rec['cottage_id'] == 'kubo')
+    reasons = [reason for reason in kubo['reasons'] if reason.startswith('Popular choice')]
+    return int(reasons[0].split()[3]) if reasons else 0
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.01)
+
+def single_property_bytes():
+    recommender = SimpleCottageRecommender()
+    recommender.load_data(*make_data())
+    return recommender.estimate_memory()
+
+class RecommenderServiceTest(unittest.TestCase):
+    def setUp(self):
+        # Room for two properties but not three
+        self.service = RecommenderService(
+            memory_budget_bytes=int(single_property_bytes() * 2.5),
+            materialize_rankings=False
+        )
+        self.loaders = {}
+        for property_id in ['p1', 'p2', 'p3']:
+            self.loaders[property_id] = CountingLoader(make_data())
+            self.service.register_property(property_id, self.loaders[property_id])
+
+    def recommend(self, property_id):
+        return self.service.recommend(property_id, 12, '2024-01-15', 'birthday party')
+
+    def test_evicts_least_recently_used_property(self):
+        self.recommend('p1')
+        self.recommend('p2')
+        self.recommend('p1')
+        self.recommend('p3')
+
+        stats = self.service.stats()
+        self.assertEqual(stats['loaded_properties'], ['p1', 'p3'])
+        self.assertEqual(stats['properties']['p2']['evictions'], 1)
+        self.assertLessEqual(stats['memory_bytes'], stats['memory_budget_bytes'])
+
+    def test_reloads_evicted_property_on_next_request(self):
+        for property_id in ['p1', 'p2', 'p3']:
+            self.recommend(property_id)
+
+        recommendations = self.recommend('p1')
+
+        self.assertEqual(recommendations[0]['cottage_id'], 've')
+        self.assertEqual(self.loaders['p1'].calls, 2)
+        self.assertEqual(self.service.stats()['properties']['p1']['loads'], 2)
+
+    def test_register_without_replace_keeps_loaded_property(self):
+        self.recommend('p1')
+
+        self.service.register_property('p1', CountingLoader(make_data()), replace=False)
+
+        self.assertTrue(self.service.stats()['properties']['p1']['loaded'])
+        self.recommend('p1')
+        self.assertEqual(self.loaders['p1'].calls, 1)
+
+    def test_unknown_property_raises(self):
+        with self.assertRaises(KeyError):
+            self.recommend('missing')
+
+    def test_reregister_during_load_uses_new_loader(self):
+        old_loader = BlockingLoader(make_data())
+        self.service.register_property('p1', old_loader)
+        request = threading.Thread(target=self.recommend, args=('p1',))
+        request.start()
+        old_loader.started.wait(5)
+
+        new_loader = CountingLoader(make_data())
+        self.service.register_property('p1', new_loader)
+        old_loader.release()
+        request.join(5)
+
+        # The stale load must not be installed for the new registration
+        self.assertFalse(self.service.stats()['properties']['p1']['loaded'])
+        self.recommend('p1')
+        self.assertEqual(new_loader.calls, 1)
+        self.assertEqual(self.service.stats()['properties']['p1']['loads'], 1)
+
+    def test_write_during_load_triggers_reload(self):
+        cottages, bookings, reviews = make_data(num_bookings=0)
+        loader = BlockingLoader((cottages, bookings, reviews))
+        self.service.register_property('p1', loader)
+        request = threading.Thread(target=self.recommend, args=('p1',))
+        request.start()
+        loader.started.wait(5)
+
+        # The booking is saved after the loader already read its data
+        booking = {'_id': 'late', 'cottageId': 'kubo', 'status': 'confirmed', 'numberOfPeople': 8}
+        self.service.add_booking('p1', booking)
+        bookings.append(booking)
+        loader.release()
+        request.join(5)
+
+        self.assertEqual(loader.calls, 2)
+        kubo = next(rec for rec in self.recommend('p1') if rec['cottage_id'] == 'kubo')
+        self.assertIn('Popular choice - 1 bookings', kubo['reasons'])
+
+    def test_write_between_load_and_install_is_not_lost(self):
+        cottages, bookings, reviews = make_data(num_bookings=0)
+        loader = CountingLoader((cottages, bookings, reviews))
+        self.service.register_property('p1', loader)
+        hooked_lock = HookedLock()
+        self.service._lock = hooked_lock
+        forwarded = []
+
+        def write_in_gap():
+            # Every time the loading thread leaves a critical section after its loader ran,
+            # save a booking and forward it, as the backend would
+            if loader.calls == 0 or len(forwarded) >= 4 or getattr(write_in_gap, 'active', False):
+                return
+            write_in_gap.active = True
+            try:
+                booking = {'_id': f'gap{len(forwarded)}', 'cottageId': 'kubo', 'status': 'confirmed',
+                           'numberOfPeople': 8}
+                bookings.append(booking)
+                forwarded.append(booking)
+                self.service.add_booking('p1', booking)
+            finally:
+                write_in_gap.active = False
+
+        hooked_lock.after_release = write_in_gap
+        self.recommend('p1')
+        hooked_lock.after_release = None
+
+        self.assertTrue(forwarded)
+        self.assertEqual(kubo_bookings(self.recommend('p1')), len(forwarded))
+
+    def test_status_changes_update_loaded_property(self):
+        cottages, bookings, reviews = make_data(num_bookings=0)
+        self.service.register_property('p1', CountingLoader((cottages, bookings, reviews)))
+        self.recommend('p1')
+
+        # New bookings are saved as pending and only count once confirmed
+        booking = {'_id': 'new', 'cottageId': 'kubo', 'status': 'pending', 'numberOfPeople': 8}
+        self.service.add_booking('p1', booking)
+        self.assertEqual(kubo_bookings(self.recommend('p1')), 0)
+
+        self.service.update_booking('p1', dict(booking, status='confirmed'))
+        self.assertEqual(kubo_bookings(self.recommend('p1')), 1)
+
+        self.service.update_booking('p1', dict(booking, status='cancelled'))
+        self.assertEqual(kubo_bookings(self.recommend('p1')), 0)
+
+        self.service.update_booking('p1', dict(booking, status='confirmed'))
+        self.service.remove_booking('p1', 'new')
+        self.assertEqual(kubo_bookings(self.recommend('p1')), 0)
+
+    def test_writes_are_counted_against_the_budget_without_requests(self):
+        self.recommend('p1')
+        self.recommend('p2')
+        before = self.service.stats()['properties']['p2']['memory_bytes']
+
+        for i in range(400):
+            self.service.add_booking('p2', {'_id': f'w{i}', 'cottageId': 'kubo', 'status': 'confirmed',
+                                            'numberOfPeople': 6})
+
+        stats = self.service.stats()
+        self.assertGreater(stats['properties']['p2']['memory_bytes'], before)
+        # p2 grew past the budget through writes alone, so the colder p1 was evicted
+        self.assertEqual(stats['loaded_properties'], ['p2'])
+        self.assertEqual(stats['properties']['p1']['evictions'], 1)
+
+    def test_background_ranking_table_is_counted(self):
+        service = RecommenderService(materialize_rankings=True)
+        service.register_property('p1', CountingLoader(make_data()))
+        service.recommend('p1', 12, '2024-01-15', 'party')
+        recommender = service._tenants['p1'].recommender
+
+        wait_for(lambda: recommender.ranking_table_version == recommender.data_version)
+        wait_for(lambda: service.stats()['memory_bytes'] == recommender.estimate_memory())
+        self.assertGreater(service.stats()['memory_bytes'], recommender._data_bytes)
+
+    def test_add_booking_updates_loaded_property(self):
+        self.recommend('p1')
+        before = self.service.stats()['properties']['p1']
+
+        self.service.add_booking('p1', {'cottageId': 'kubo', 'status': 'confirmed', 'numberOfPeople': 8})
+        self.recommend('p1')
+
+        after = self.service.stats()['properties']['p1']
+        self.assertEqual(after['data_version'], before['data_version'] + 1)
+        self.assertGreater(after['memory_bytes'], before['memory_bytes'])
+        self.assertEqual(self.loaders['p1'].calls, 1)
+
+    def test_stats_report_requests_and_latency(self):
+        self.recommend('p1')
+        self.recommend('p1')
+
+        stats = self.service.stats()
+        p1 = stats['properties']['p1']
+        self.assertEqual(p1['requests'], 2)
+        self.assertEqual(p1['loads'], 1)
+        self.assertTrue(p1['loaded'])
+        self.assertGreater(p1['avg_latency_ms'], 0)
+        self.assertGreaterEqual(p1['max_latency_ms'], p1['avg_latency_ms'])
+        self.assertEqual(stats['memory_bytes'], p1['memory_bytes'])
+        self.assertFalse(stats['properties']['p2']['loaded'])
+        self.assertEqual(stats['properties']['p2']['requests'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import random
+import unittest
+
+from simple_recommender import SimpleCottageRecommender
+
+# A special request that detect_special_notes maps to exactly one occasion
+OCCASION_REQUESTS = {
+    'birthday': 'bday',
+    'anniversary': 'anniversary',
+    'party': 'party',
+    'videoke': 'karaoke'
+}
+
+def make_data(seed=3):
+    """Resort data with overlapping capacities, ties and low-rated occasion reviews"""
+    rng = random.Random(seed)
+    cottages = [
+        {'_id': 've', 'name': 'VE Cottage', 'description': 'With videoke', 'capacity': '10-25 guests'},
+        {'_id': 'kubo', 'name': 'Kubo Type', 'description': 'Traditional kubo', 'capacity': '5-15 guests'},
+        {'_id': 'garden', 'name': 'Garden Table', 'description': 'Garden setting', 'capacity': '5 guests'},
+        {'_id': 'room', 'name': 'Room 1', 'description': 'Karaoke room with videoke', 'capacity': '2-8 guests'}
+    ]
+    bookings = [
+        {
+            '_id': f'b{i}',
+            'cottageId': rng.choice(cottages)['_id'],
+            'status': rng.choice(['confirmed', 'completed', 'pending']),
+            'numberOfPeople': rng.randint(1, 30)
+        }
+        for i in range(150)
+    ]
+    comments = ['Great for birthday parties!', 'Ruined our anniversary', 'Loved the karaoke', 'Nice', None]
+    reviews = [
+        {
+            '_id': f'r{i}',
+            'cottageId': rng.choice(cottages)['_id'],
+            'rating': rng.randint(1, 5),
+            'comment': rng.choice(comments)
+        }
+        for i in range(60)
+    ]
+    return cottages, bookings, reviews
+
+def special_request_for(mask):
+    return ' '.join(
+        OCCASION_REQUESTS[occasion]
+        for bit, occasion in enumerate(SimpleCottageRecommender.OCCASIONS) if mask & (1 << bit)
+    )
+
+class RankingTableTest(unittest.TestCase):
+    def setUp(self):
+        self.live = SimpleCottageRecommender()
+        self.live.load_data(*make_data())
+        self.materialized = SimpleCottageRecommender()
+        self.materialized.load_data(*make_data())
+        self.materialized.build_ranking_table()
+
+    def test_table_matches_live_ranking(self):
+        for guest_count in range(1, self.materialized.max_guest_count() + 1):
+            for mask in range(1 << len(SimpleCottageRecommender.OCCASIONS)):
+                special_requests = special_request_for(mask)
+                occasions = self.live.detect_special_notes(special_requests)
+                self.assertEqual(self.materialized._occasion_mask(occasions), mask)
+
+                for num_recommendations in range(1, SimpleCottageRecommender.RANKING_TABLE_TOP_K + 1):
+                    served = self.materialized._lookup_ranking(guest_count, occasions, num_recommendations)
+                    self.assertIsNotNone(served)
+                    self.assertEqual(
+                        served,
+                        self.live.recommend_cottages(guest_count, '2024-01-15', special_requests, num_recommendations),
+                        (guest_count, special_requests, num_recommendations)
+                    )
+
+    def test_stale_table_is_not_served(self):
+        booking = {'_id': 'new', 'cottageId': 'garden', 'status': 'confirmed', 'numberOfPeople': 5}
+        self.materialized.add_booking(dict(booking))
+        self.live.add_booking(dict(booking))
+
+        self.assertIsNone(self.materialized._lookup_ranking(5, [], 3))
+        self.assertEqual(
+            self.materialized.recommend_cottages(5, '2024-01-15', ''),
+            self.live.recommend_cottages(5, '2024-01-15', '')
+        )
+
+    def test_older_build_does_not_replace_newer_table(self):
+        # Pretend a concurrent build from newer data was installed first
+        newer = self.materialized._ranking_table
+        newer['version'] = self.materialized.data_version + 1
+
+        self.materialized.build_ranking_table()
+
+        self.assertTrue(self.materialized._ranking_table is newer)
+
+    def test_requests_outside_the_table_fall_back_to_live_ranking(self):
+        max_guest_count = self.materialized.max_guest_count()
+        uncovered = [
+            (4.0, 3),
+            (0, 3),
+            (max_guest_count + 1, 3),
+            (4, SimpleCottageRecommender.RANKING_TABLE_TOP_K + 1)
+        ]
+        for guest_count, num_recommendations in uncovered:
+            self.assertIsNone(self.materialized._lookup_ranking(guest_count, ['party'], num_recommendations))
+            self.assertEqual(
+                self.materialized.recommend_cottages(guest_count, '2024-01-15', 'party', num_recommendations),
+                self.live.recommend_cottages(guest_count, '2024-01-15', 'party', num_recommendations)
+            )
+
+    def test_served_rankings_are_copies(self):
+        served = self.materialized.recommend_cottages(5, '2024-01-15', 'party')
+        served[0]['reasons'].append('tampered')
+
+        self.assertNotIn('tampered', self.materialized.recommend_cottages(5, '2024-01-15', 'party')[0]['reasons'])
+
+class IncrementalIndexTest(unittest.TestCase):
+    def test_incremental_updates_match_full_rebuild(self):
+        cottages, bookings, reviews = make_data()
+        full = SimpleCottageRecommender()
+        full.load_data(cottages, bookings, reviews)
+
+        incremental = SimpleCottageRecommender()
+        incremental.load_data(cottages, bookings[:50], reviews[:20])
+        for booking in bookings[50:]:
+            incremental.add_booking(booking)
+        for review in reviews[20:]:
+            incremental.add_review(review)
+
+        self.assertEqual(incremental.occasion_index, full.occasion_index)
+        self.assertEqual(incremental.occasion_max_mentions, full.occasion_max_mentions)
+        self.assertEqual(incremental.party_size_histograms, full.party_size_histograms)
+        self.assertEqual(incremental.party_size_totals, full.party_size_totals)
+
+    def test_updates_and_removals_match_full_rebuild(self):
+        cottages, bookings, reviews = make_data()
+        incremental = SimpleCottageRecommender()
+        incremental.load_data(cottages, bookings, reviews)
+
+        final_bookings = list(bookings)
+        for position in range(0, 150, 3):
+            changed = dict(bookings[position], status='confirmed', numberOfPeople=position % 40 + 1)
+            incremental.update_booking(changed)
+            final_bookings[position] = changed
+        for position in range(1, 150, 4):
+            self.assertTrue(incremental.remove_booking(bookings[position]['_id']))
+            final_bookings[position] = None
+        self.assertFalse(incremental.remove_booking('unknown'))
+
+        full = SimpleCottageRecommender()
+        full.load_data(cottages, [booking for booking in final_bookings if booking is not None], reviews)
+
+        self.assertEqual(incremental.party_size_totals, full.party_size_totals)
+        for cottage_id, histogram in full.party_size_histograms.items():
+            counts = incremental.party_size_histograms[cottage_id]
+            # Removals can leave trailing empty buckets behind
+            self.assertEqual(list(counts[:len(histogram)]), list(histogram))
+            self.assertFalse(any(counts[len(histogram):]))
+        self.assertEqual(incremental.analyze_best_sellers(), full.analyze_best_sellers())
+
+    def test_add_booking_with_known_id_replaces_it(self):
+        cottages, bookings, reviews = make_data()
+        recommender = SimpleCottageRecommender()
+        recommender.load_data(cottages, bookings, reviews)
+
+        recommender.add_booking(dict(bookings[0]))
+
+        self.assertEqual(len(recommender.bookings), 150)
+
+    def test_load_data_does_not_modify_callers_lists(self):
+        cottages, bookings, reviews = make_data()
+        recommender = SimpleCottageRecommender()
+        recommender.load_data(cottages, bookings, reviews)
+
+        recommender.add_booking({'cottageId': 've', 'status': 'confirmed', 'numberOfPeople': 4})
+        recommender.add_review({'cottageId': 've', 'rating': 5, 'comment': 'party'})
+
+        self.assertEqual(len(bookings), 150)
+        self.assertEqual(len(reviews), 60)
+
+    def test_oversized_parties_share_the_overflow_bucket(self):
+        recommender = SimpleCottageRecommender()
+        recommender.load_data([], [
+            {'cottageId': 've', 'status': 'confirmed', 'numberOfPeople': 20000000},
+            {'cottageId': 've', 'status': 'confirmed', 'numberOfPeople': 60}
+        ], [])
+
+        histogram = recommender.party_size_histograms['ve']
+        self.assertEqual(len(histogram), SimpleCottageRecommender.MAX_PARTY_SIZE + 2)
+        self.assertEqual(histogram[-1], 2)
+
+if __name__ == '__main__':
+    unittest.main()
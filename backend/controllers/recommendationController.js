@@ -4,44 +4,51 @@ const Cottage = require('../models/cottage');
 const Booking = require('../models/Booking');
 const Review = require('../models/Review');
 
+// Fetch the cottages, bookings and reviews the recommender scores, in the shape it expects
+async function loadRecommendationData() {
+  const cottages = await Cottage.find({ available: true });
+  const bookings = await Booking.find({ 
+    status: { $in: ['confirmed', 'completed'] } 
+  }); // Removed .populate('cottageId')
+  const reviews = await Review.find({}); // Removed .populate('cottageId')
+  
+  // Prepare data for AI service
+  const cottagesData = cottages.map(cottage => ({
+    _id: cottage._id.toString(),
+    name: cottage.name,
+    description: cottage.description,
+    price: cottage.price,
+    capacity: cottage.capacity,
+    image: cottage.image,
+    type: cottage.type,
+    amenities: cottage.amenities
+  }));
+  
+  const bookingsData = bookings.map(booking => ({
+    _id: booking._id.toString(),
+    cottageId: booking.cottageId ? booking.cottageId.toString() : '',
+    status: booking.status,
+    bookingDate: booking.bookingDate ? booking.bookingDate.toISOString() : '',
+    numberOfPeople: booking.numberOfPeople,
+    specialRequests: booking.specialRequests
+  }));
+  
+  const reviewsData = reviews.map(review => ({
+    _id: review._id.toString(),
+    cottageId: review.cottageId ? review.cottageId.toString() : '',
+    rating: review.rating,
+    comment: review.comment
+  }));
+  
+  return { cottagesData, bookingsData, reviewsData };
+}
+
 exports.getRecommendations = async (req, res) => {
   try {
     const { guest_count, booking_date, special_requests } = req.query;
     
     // Fetch data from database
-    const cottages = await Cottage.find({ available: true });
-    const bookings = await Booking.find({ 
-      status: { $in: ['confirmed', 'completed'] } 
-    }); // Removed .populate('cottageId')
-    const reviews = await Review.find({}); // Removed .populate('cottageId')
-    
-    // Prepare data for AI service
-    const cottagesData = cottages.map(cottage => ({
-      _id: cottage._id.toString(),
-      name: cottage.name,
-      description: cottage.description,
-      price: cottage.price,
-      capacity: cottage.capacity,
-      image: cottage.image,
-      type: cottage.type,
-      amenities: cottage.amenities
-    }));
-    
-    const bookingsData = bookings.map(booking => ({
-      _id: booking._id.toString(),
-      cottageId: booking.cottageId ? booking.cottageId.toString() : '',
-      status: booking.status,
-      bookingDate: booking.bookingDate ? booking.bookingDate.toISOString() : '',
-      numberOfPeople: booking.numberOfPeople,
-      specialRequests: booking.specialRequests
-    }));
-    
-    const reviewsData = reviews.map(review => ({
-      _id: review._id.toString(),
-      cottageId: review.cottageId ? review.cottageId.toString() : '',
-      rating: review.rating,
-      comment: review.comment
-    }));
+    const { cottagesData, bookingsData, reviewsData } = await loadRecommendationData();
     
     // Call Python recommender script
     const pythonScript = path.join(__dirname, '../../ai/simple_recommender.py');
@@ -114,6 +121,23 @@ exports.getRecommendations = async (req, res) => {
   }
 };
 
+// Data feed for the multi-property recommender service (ai/recommender.py), which loads
+// each resort's data from its backend. Requires the shared RECOMMENDER_DATA_KEY.
+exports.getRecommendationData = async (req, res) => {
+  const dataKey = process.env.RECOMMENDER_DATA_KEY;
+  if (!dataKey || req.get('X-Recommender-Key') !== dataKey) {
+    return res.status(403).json({ success: false, message: 'Access denied' });
+  }
+  
+  try {
+    const { cottagesData, bookingsData, reviewsData } = await loadRecommendationData();
+    res.json({ cottages: cottagesData, bookings: bookingsData, reviews: reviewsData });
+  } catch (error) {
+    console.error('Recommendation data error:', error.message);
+    res.status(500).json({ success: false, message: 'Failed to load recommendation data' });
+  }
+};
+
 function getFallbackRecommendations(guestCount, specialRequests) {
   const specialRequestsLower = (specialRequests || '').toLowerCase();
   const hasSpecialOccasion = specialRequestsLower.includes('birthday') || 
@@ -18,5 +18,6 @@ router.get('/gallery-images', (req, res) => {
 });
 
 router.get('/', recommendationController.getRecommendations);
+router.get('/data', recommendationController.getRecommendationData);
  
 module.exports = router; 
\ No newline at end of file